@@ -1,20 +1,50 @@
+import asyncio
+import copy
 import json
 import os
 import random
-import time
+import sqlite3
+import threading
 import logging
-from typing import Tuple, Optional, Dict, List
+from collections import deque
+from concurrent.futures import Future, wait
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Coroutine, Deque, Iterable, Tuple, Optional, Dict, List, NamedTuple, Set, TypeVar
 from auth import init_auth_state, login_page, show_logout_button
 import streamlit as st
 from datetime import datetime
 from dotenv import load_dotenv
 import anthropic
+import fastjsonschema
+import httpx
 
-# Configure logging with more detail
+T = TypeVar('T')
+
+# orjson is faster for the pool's JSON rows; fall back to the stdlib if it is missing
+try:
+    import orjson
+    _loads = orjson.loads
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
+
+@st.cache_resource(show_spinner=False)
+def _load_env() -> None:
+    """Load variables from a local .env file once per process."""
+    load_dotenv()
+
+_load_env()
+
+# Configure logging with more detail; set LOG_LEVEL=DEBUG to include raw responses
 logging.basicConfig(
-    level=logging.INFO,
+    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO),
     format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
 )
+logger = logging.getLogger(__name__)
 
 class GameTheme:
     """Theme configuration for the game"""
@@ -27,53 +57,13 @@ class GameTheme:
         'background': '#F8F9FA'     # Light Gray
     }
     
-    CUSTOM_CSS = """
-        <style>
-            .stApp {
-                background-color: #F8F9FA;
-            }
-            
-            .main-header {
-                font-size: 2.5rem;
-                color: #1E88E5;
-                text-align: center;
-                margin-bottom: 2rem;
-            }
-            
-            .category-badge {
-                background-color: #E3F2FD;
-                padding: 0.5rem 1rem;
-                border-radius: 1rem;
-                color: #1E88E5;
-                font-weight: bold;
-            }
-            
-            .question-card {
-                background-color: white;
-                padding: 2rem;
-                border-radius: 1rem;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                margin: 1rem 0;
-            }
-            
-            .stats-card {
-                background-color: white;
-                padding: 1rem;
-                border-radius: 0.5rem;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-                margin-bottom: 1rem;
-            }
-            
-            .option-button {
-                transition: all 0.3s;
-            }
-            
-            .option-button:hover {
-                background-color: #E3F2FD;
-                cursor: pointer;
-            }
-        </style>
-    """
+    CSS_PATH: Path = Path(__file__).parent / '.streamlit' / 'style.css'
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False)
+    def custom_css() -> str:
+        """Read the stylesheet once per process and wrap it for st.markdown."""
+        return f"<style>{GameTheme.CSS_PATH.read_text()}</style>"
 
 class GameConfig:
     CATEGORIES: List[str] = [
@@ -81,9 +71,94 @@ class GameConfig:
         'Space', 'Animals', 'Nature', 'Geography', 'Biology'
     ]
     MAX_PREVIOUS: int = 10
+    # Categories picked in the last RECENT_CATEGORIES questions are each
+    # weighted down by RECENT_CATEGORY_WEIGHT per use
+    RECENT_CATEGORIES: int = 4
+    RECENT_CATEGORY_WEIGHT: float = 0.1
+    # Previous questions are sent to Claude cut to this many characters
+    PREVIOUS_PROMPT_CHARS: int = 80
     MAX_RETRIES: int = 3
     RETRY_DELAY: int = 2
-    CLAUDE_MODEL: str = "claude-3-opus-20240229"
+    RETRY_MAX_DELAY: int = 30
+    CLAUDE_MODELS: Dict[str, str] = {
+        'haiku': 'claude-3-5-haiku-20241022',
+        'sonnet': 'claude-3-5-sonnet-20241022',
+        'opus': 'claude-3-opus-20240229',
+    }
+    # 'auto' picks a model per school level: Haiku is plenty below high school
+    AUTO_MODELS: Dict[str, str] = {
+        'Elementary': 'haiku',
+        'Middle': 'haiku',
+        'High': 'sonnet',
+    }
+    MODEL_CHOICES: Tuple[str, ...] = ('auto', *CLAUDE_MODELS)
+    MODEL_ALIASES: Dict[str, str] = {model_id: alias for alias, model_id in CLAUDE_MODELS.items()}
+    # Default model choice, overridable with the CLAUDE_MODEL environment
+    # variable as either an alias or a full model ID from CLAUDE_MODELS
+    CLAUDE_MODEL: str = os.getenv('CLAUDE_MODEL', 'auto').lower()
+    CLAUDE_MODEL = MODEL_ALIASES.get(CLAUDE_MODEL, CLAUDE_MODEL)
+    if CLAUDE_MODEL not in MODEL_CHOICES:
+        logger.warning("CLAUDE_MODEL=%r is not a known model alias or ID; using 'auto'", CLAUDE_MODEL)
+        CLAUDE_MODEL = 'auto'
+    MAX_TOKENS: int = 300
+    TEMPERATURE: float = 0.7
+    # Fresh questions can be sampled this many times at once, keeping the first
+    # valid one; each extra sample runs TEMPERATURE_STEP hotter, capped at 1.0
+    PARALLEL_SAMPLES: int = 1
+    TEMPERATURE_STEP: float = 0.15
+    # Static instructions sent as the system prompt; only the category,
+    # grade and previous questions vary between requests.
+    SYSTEM_PROMPT: str = (
+        "You are a creative teacher creating unique and varied trivia questions for school students. "
+        "Each question should be associated with a specific category. "
+        "Avoid repeating any previous questions.\n\n"
+        "Always record questions by calling the tool you are given. "
+        "Answer is the letter of the correct option, and Explanation briefly says why it is correct."
+    )
+    QUESTION_SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "Question": {"type": "string"},
+            "A": {"type": "string"},
+            "B": {"type": "string"},
+            "C": {"type": "string"},
+            "D": {"type": "string"},
+            "Answer": {"type": "string", "enum": ["A", "B", "C", "D"]},
+            "Explanation": {"type": "string"},
+            "Category": {"type": "string"},
+        },
+        "required": ["Question", "A", "B", "C", "D", "Answer", "Explanation", "Category"],
+    }
+    QUESTION_TOOL: Dict[str, Any] = {
+        "name": "emit_trivia",
+        "description": "Record one multiple-choice trivia question.",
+        "input_schema": QUESTION_SCHEMA,
+    }
+    QUESTION_TOOL_CHOICE: Dict[str, str] = {"type": "tool", "name": "emit_trivia"}
+    BATCH_TOOL: Dict[str, Any] = {
+        "name": "emit_trivia_batch",
+        "description": "Record several different multiple-choice trivia questions.",
+        "input_schema": {
+            "type": "object",
+            "properties": {"questions": {"type": "array", "items": QUESTION_SCHEMA}},
+            "required": ["questions"],
+        },
+    }
+    BATCH_TOOL_CHOICE: Dict[str, str] = {"type": "tool", "name": "emit_trivia_batch"}
+
+    # Shared pool of pre-generated questions per (grade, category)
+    POOL_DB: Path = Path.home() / '.trivia_cache' / 'questions.sqlite'
+    POOL_BATCH_SIZE: int = 8
+    POOL_MAX_TOKENS: int = 1800
+    POOL_REFILL_THRESHOLD: int = 3
+    POOL_MAX_SIZE: int = 50
+    # Chance of generating a fresh question even when the pool could serve one
+    POOL_FRESH_PROBABILITY: float = 0.2
+    BATCH_POLL_INTERVAL: int = 30
+
+    # Connection pool shared by the foreground, prefetch and refill requests
+    HTTP_TIMEOUT: httpx.Timeout = httpx.Timeout(30.0, connect=5.0)
+    HTTP_LIMITS: httpx.Limits = httpx.Limits(max_keepalive_connections=20, max_connections=20, keepalive_expiry=60.0)
     
     GRADE_INDICATORS: Dict[str, str] = {
         'Elementary': '🎈',
@@ -91,205 +166,697 @@ class GameConfig:
         'High': '🎓'
     }
 
+# Compiled once; same shape as the tool schema but every field must be non-blank
+_validate_question = fastjsonschema.compile({
+    **GameConfig.QUESTION_SCHEMA,
+    "properties": {
+        key: {**spec, "pattern": r"\S"}
+        for key, spec in GameConfig.QUESTION_SCHEMA["properties"].items()
+    },
+})
+
+# (school level, emoji) for grades 0-12, indexed by grade
+_GRADE_TABLE: Tuple[Tuple[str, str], ...] = tuple(
+    (level, GameConfig.GRADE_INDICATORS[level])
+    for level in (
+        'Elementary' if grade <= 5 else 'Middle' if grade <= 8 else 'High'
+        for grade in range(13)
+    )
+)
+
 def get_grade_level_info(grade: int) -> Tuple[str, str]:
     """Return the school level and emoji for a given grade."""
-    if grade <= 5:
-        return 'Elementary', GameConfig.GRADE_INDICATORS['Elementary']
-    elif grade <= 8:
-        return 'Middle', GameConfig.GRADE_INDICATORS['Middle']
-    return 'High', GameConfig.GRADE_INDICATORS['High']
+    return _GRADE_TABLE[grade]
+
+def resolve_model(choice: str, grade: int) -> str:
+    """Return the CLAUDE_MODELS alias to use for a model choice at a given grade."""
+    if choice == 'auto':
+        return GameConfig.AUTO_MODELS[_GRADE_TABLE[grade][0]]
+    return choice
+
+@st.cache_resource(show_spinner=False)
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop that runs every Claude request, started on a daemon thread."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="trivia-asyncio", daemon=True).start()
+    return loop
+
+def run_async(coro: Coroutine[Any, Any, T]) -> Future:
+    """Schedule a coroutine on the shared event loop from the script thread."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+class QuestionPool:
+    """Thread-safe cache of generated questions keyed by (grade, category).
+
+    Questions are reused across sessions rather than consumed. They live in
+    a SQLite database under the cache directory, so the pool survives
+    restarts.
+    """
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            grade INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            question TEXT NOT NULL,
+            data TEXT NOT NULL,
+            UNIQUE (grade, category, question)
+        )
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._refilling: Set[Tuple[int, str]] = set()
+        self._warming: Set[int] = set()
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the script and event loop threads; _lock serialises access
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(self._SCHEMA)
+
+    def size(self, grade: int, category: str) -> int:
+        try:
+            with self._lock:
+                (count,) = self._db.execute(
+                    "SELECT COUNT(*) FROM questions WHERE grade = ? AND category = ?",
+                    (grade, category)
+                ).fetchone()
+            return count
+        except sqlite3.Error as e:
+            logger.error("Error reading question pool for grade %s %s: %s", grade, category, e)
+            return 0
+
+    def sample(self, grade: int, category: str, exclude: Iterable[str]) -> Optional[Dict]:
+        """Return a random pooled question whose text is not in ``exclude``."""
+        excluded = list(exclude)
+        placeholders = ", ".join("?" * len(excluded))
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT data FROM questions WHERE grade = ? AND category = ?"
+                    f" AND question NOT IN ({placeholders}) ORDER BY RANDOM() LIMIT 1",
+                    (grade, category, *excluded)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Error reading question pool for grade %s %s: %s", grade, category, e)
+            return None
+        return _loads(row[0]) if row else None
+
+    def add(self, grade: int, category: str, new_questions: List[Dict]) -> None:
+        """Store new questions, skipping duplicates and keeping the newest POOL_MAX_SIZE."""
+        rows = [(grade, category, q['Question'].strip(), _dumps(q)) for q in new_questions]
+        try:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO questions (grade, category, question, data) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._db.execute(
+                    "DELETE FROM questions WHERE grade = ? AND category = ? AND id NOT IN"
+                    " (SELECT id FROM questions WHERE grade = ? AND category = ? ORDER BY id DESC LIMIT ?)",
+                    (grade, category, grade, category, GameConfig.POOL_MAX_SIZE)
+                )
+        except sqlite3.Error as e:
+            logger.error("Error saving question pool for grade %s %s: %s", grade, category, e)
+
+    def claim_refill(self, grade: int, category: str) -> bool:
+        """Mark a key as being refilled; False if a refill is already running."""
+        with self._lock:
+            if (grade, category) in self._refilling:
+                return False
+            self._refilling.add((grade, category))
+            return True
+
+    def release_refill(self, grade: int, category: str) -> None:
+        with self._lock:
+            self._refilling.discard((grade, category))
+
+    def claim_warm(self, grade: int) -> bool:
+        """Mark a grade as being pre-warmed; False if a warm-up batch is already running."""
+        with self._lock:
+            if grade in self._warming:
+                return False
+            self._warming.add(grade)
+            return True
+
+    def release_warm(self, grade: int) -> None:
+        with self._lock:
+            self._warming.discard(grade)
+
+    def is_warming(self, grade: int) -> bool:
+        """True while a warm-up batch for the grade is still pending."""
+        with self._lock:
+            return grade in self._warming
+
+@st.cache_resource(show_spinner=False)
+def get_question_pool() -> QuestionPool:
+    """Return the question pool shared by all sessions."""
+    return QuestionPool(GameConfig.POOL_DB)
 
 class AnthropicClient:
     @staticmethod
-    def create() -> anthropic.Anthropic:
-        """Create and return an Anthropic client instance."""
+    @st.cache_resource(show_spinner=False)
+    def create() -> anthropic.AsyncAnthropic:
+        """Create a single Anthropic client shared across reruns and sessions."""
         try:
             api_key = st.secrets.get("ANTHROPIC_API_KEY") or os.getenv("ANTHROPIC_API_KEY")
             if not api_key:
                 st.error("Anthropic API key is not set. Please configure secrets or .env file.")
                 st.stop()
                 
-            logging.info("API key loaded successfully")
-            return anthropic.Anthropic(api_key=api_key)
+            logger.info("API key loaded successfully")
+            return anthropic.AsyncAnthropic(
+                api_key=api_key,
+                http_client=anthropic.DefaultAsyncHttpxClient(
+                    http2=True,
+                    timeout=GameConfig.HTTP_TIMEOUT,
+                    limits=GameConfig.HTTP_LIMITS
+                )
+            )
         except Exception as e:
-            logging.error(f"Error in create_client: {str(e)}")
+            logger.error("Error in create_client: %s", e)
             st.error(f"Error initializing Anthropic client: {str(e)}")
             st.stop()
 
 class SessionState:
     """Class to manage session state initialization and updates."""
+    # Read-only template; mutable defaults are copied per session in initialize()
+    DEFAULTS: MappingProxyType = MappingProxyType({
+        'score': 0,
+        'total_questions': 0,
+        'previous_questions': deque(maxlen=GameConfig.MAX_PREVIOUS),
+        'recent_categories': deque(maxlen=GameConfig.RECENT_CATEGORIES),
+        'current_question': None,
+        'question_id': 0,
+        'options': [],
+        'correct_answer': '',
+        'explanation': '',
+        'category': '',
+        'answered': False,
+        'game_over': False,
+        'loading_question': False,
+        'grade_level': 4,
+        'model': GameConfig.CLAUDE_MODEL,
+        'current_attempts': 0,
+        'total_attempts': 0,
+        'retry_mode': False,
+        'next_question_future': None,
+        'next_question_context': None,
+        'warmed_grades': set(),
+        'bulk_mode': False,
+    })
+    # Login and user preferences survive a game reset
+    PRESERVED_KEYS: frozenset = frozenset({'authenticated', 'username', 'grade_level', 'model', 'bulk_mode', 'warmed_grades'})
+
     @staticmethod
     def initialize() -> None:
-        """Initialize default values in session state."""
-        defaults = {
-            'score': 0,
-            'total_questions': 0,
-            'previous_questions': [],
-            'used_categories': [],
-            'current_question': None,
-            'options': [],
-            'correct_answer': '',
-            'explanation': '',
-            'category': '',
-            'answered': False,
-            'game_over': False,
-            'loading_question': False,
-            'grade_level': 4,
-            'current_attempts': 0,
-            'total_attempts': 0,
-            'retry_mode': False,
-        }
-        for key, value in defaults.items():
-            if key not in st.session_state:
-                st.session_state[key] = value
+        """Initialize default values in session state once per session."""
+        if st.session_state.get('_initialized'):
+            return
+        for key, value in SessionState.DEFAULTS.items():
+            st.session_state.setdefault(key, copy.copy(value))
+        st.session_state['_initialized'] = True
 
     @staticmethod
     def reset_game() -> None:
         """Reset the game to its initial state."""
         try:
-            st.session_state.update({
-                'score': 0,
-                'total_questions': 0,
-                'previous_questions': [],
-                'used_categories': [],
-                'current_question': None,
-                'options': [],
-                'correct_answer': '',
-                'explanation': '',
-                'category': '',
-                'answered': False,
-                'game_over': False,
-                'loading_question': False,
-                'current_attempts': 0,
-                'total_attempts': 0,
-                'retry_mode': False,
-            })
-            logging.info("Game reset successfully")
+            # Stop a pending prefetch so it does not bill a question nobody will see
+            future = st.session_state.get('next_question_future')
+            if future is not None:
+                future.cancel()
+            for key in list(st.session_state.keys()):
+                if key not in SessionState.PRESERVED_KEYS:
+                    del st.session_state[key]
+            SessionState.initialize()
+            logger.info("Game reset successfully")
         except Exception as e:
-            logging.error(f"Error resetting game: {str(e)}")
+            logger.error("Error resetting game: %s", e)
             st.error("Failed to reset game")
 
 class QuestionGenerator:
-    def __init__(self, client: anthropic.Anthropic):
+    _REQUEST_TEMPLATE = (
+        "Create a new multiple-choice trivia question about {category} "
+        "suitable for grade {grade} ({school_level} School)."
+    )
+    _PREVIOUS_TEMPLATE = "Previous questions to avoid:\n{previous}"
+    _TEXT_FIELDS = ('Question', 'A', 'B', 'C', 'D', 'Explanation', 'Category')
+    _BATCH_TEMPLATE = (
+        "Create {count} different multiple-choice trivia questions about {category} "
+        "suitable for grade {grade} ({school_level} School). "
+        "Cover a different topic in each question."
+    )
+
+    def __init__(self, client: anthropic.AsyncAnthropic, pool: QuestionPool):
         self.client = client
+        self.pool = pool
 
-    def prepare_prompt(self, category: str, previous_questions: List[str]) -> str:
-        """Prepare the prompt for Claude."""
-        grade = st.session_state['grade_level']
+    def prepare_prompt(self, category: str, grade: int, previous_questions: Iterable[str]) -> str:
+        """Prepare the user prompt for a single question."""
         school_level, _ = get_grade_level_info(grade)
         
-        return (
-            f"You are a creative teacher creating unique and varied trivia questions for {school_level} School students. "
-            "Each question should be associated with a specific category. "
-            "Avoid repeating any previous questions.\n\n"
-            f"Create a new multiple-choice trivia question about {category} suitable for grade {grade}.\n\n"
-            "You must respond with a valid JSON object containing exactly these keys: "
-            "Question, A, B, C, D, Answer, Explanation, and Category.\n\n"
-            "The Answer must be either 'A', 'B', 'C', or 'D' corresponding to the correct option.\n\n"
-            f"Previous questions to avoid:\n{chr(10).join(previous_questions)}\n\n"
-            "Response format example:\n"
-            "{\n"
-            '    "Question": "What is 2 + 2?",\n'
-            '    "A": "3",\n'
-            '    "B": "4",\n'
-            '    "C": "5",\n'
-            '    "D": "6",\n'
-            '    "Answer": "B",\n'
-            '    "Explanation": "2 + 2 equals 4.",\n'
-            '    "Category": "Math"\n'
-            "}\n\n"
-            "Ensure your response is exactly in this JSON format with no additional text before or after. "
-            "Do not include any markdown formatting or code blocks in your response."
+        previous = "\n".join(
+            f"- {question[:GameConfig.PREVIOUS_PROMPT_CHARS]}" for question in previous_questions
         )
+        return "\n\n".join((
+            self._REQUEST_TEMPLATE.format(category=category, grade=grade, school_level=school_level),
+            self._PREVIOUS_TEMPLATE.format(previous=previous),
+        ))
+
+    def prepare_batch_prompt(self, category: str, grade: int, count: int) -> str:
+        """Prepare the prompt for a batch of pooled questions."""
+        school_level, _ = get_grade_level_info(grade)
+        
+        return self._BATCH_TEMPLATE.format(count=count, category=category, grade=grade, school_level=school_level)
 
-    def generate_question(self, previous_questions: List[str], used_categories: List[str]) -> Optional[str]:
-        """Generate a new trivia question using Claude API."""
+    @staticmethod
+    def choose_category(recent_categories: Deque[str]) -> str:
+        """Pick a weighted random category, making each recent use of one less likely, and record it."""
+        weights = dict.fromkeys(GameConfig.CATEGORIES, 1.0)
+        for category in recent_categories:
+            weights[category] *= GameConfig.RECENT_CATEGORY_WEIGHT
+        category = random.choices(GameConfig.CATEGORIES, weights=list(weights.values()))[0]
+        recent_categories.append(category)
+        return category
+
+    @staticmethod
+    def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+        """Backoff before the next attempt: the server's Retry-After if given, else exponential, capped, plus jitter."""
         try:
-            available_categories = [cat for cat in GameConfig.CATEGORIES if cat not in used_categories]
-            if not available_categories:
-                available_categories = GameConfig.CATEGORIES.copy()
-                st.session_state['used_categories'] = []
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = GameConfig.RETRY_DELAY * (2 ** attempt)
+        delay = min(delay, GameConfig.RETRY_MAX_DELAY)
+        return delay + random.uniform(0, delay * 0.25)
 
-            category = random.choice(available_categories)
-            st.session_state['used_categories'].append(category)
+    @staticmethod
+    async def _call_with_retries(call: Callable[[], Awaitable[T]]) -> Optional[T]:
+        """Run an API call, retrying rate limits, server errors and connection failures."""
+        for attempt in range(GameConfig.MAX_RETRIES):
+            try:
+                return await call()
+            except anthropic.APIStatusError as e:
+                if e.status_code != 429 and e.status_code < 500:
+                    logger.error("Claude API error %s is not retryable: %s", e.status_code, e)
+                    return None
+                delay = QuestionGenerator._retry_delay(attempt, e.response.headers.get('retry-after'))
+                error = e
+            except anthropic.APIConnectionError as e:
+                delay = QuestionGenerator._retry_delay(attempt)
+                error = e
+            except anthropic.APIError as e:
+                logger.error("Claude API error is not retryable: %s", e)
+                return None
+            if attempt == GameConfig.MAX_RETRIES - 1:
+                logger.error("Claude API error on final attempt %s: %s", attempt + 1, error)
+                break
+            logger.error("Claude API error on attempt %s: %s. Retrying in %.1f seconds.", attempt + 1, error, delay)
+            await asyncio.sleep(delay)
+        return None
 
-            previous = previous_questions[-GameConfig.MAX_PREVIOUS:]
-            prompt = self.prepare_prompt(category, previous)
-            
-            logging.info(f"Attempting to generate question for category: {category}")
-            
-            for attempt in range(GameConfig.MAX_RETRIES):
-                try:
-                    message = self.client.messages.create(
-                        model=GameConfig.CLAUDE_MODEL,
-                        max_tokens=300,
-                        temperature=1.0,
-                        system="You are a creative teacher generating trivia questions. Respond only with valid JSON.",
-                        messages=[{"role": "user", "content": prompt}]
-                    )
-                    logging.info("Successfully received response from Claude")
-                    return message.content[0].text
-                except anthropic.APIError as e:
-                    delay = GameConfig.RETRY_DELAY * (2 ** attempt)
-                    logging.error(f"Claude API error on attempt {attempt + 1}: {e}. Retrying in {delay} seconds.")
-                    time.sleep(delay)
+    @staticmethod
+    def _log_usage(message: Any) -> None:
+        """Log the input and output token usage of a response."""
+        usage = message.usage
+        logger.info("Token usage: input=%s output=%s", usage.input_tokens, usage.output_tokens)
+
+    async def request_question(
+        self,
+        category: str,
+        grade: int,
+        model: str,
+        previous_questions: Iterable[str],
+        on_progress: Optional[Callable[[int, str], None]] = None,
+        temperature: float = GameConfig.TEMPERATURE
+    ) -> Optional[Dict]:
+        """Stream a question from the Claude API.
+
+        Returns the emit_trivia tool input, or None if the call failed. Runs on
+        the shared event loop and does not touch Streamlit state.
+        ``on_progress`` is called with the number of characters received so
+        far and the question text streamed so far.
+        """
+        content = self.prepare_prompt(category, grade, previous_questions)
+        
+        logger.info("Attempting to generate question for category: %s", category)
+        
+        async def stream_question():
+            received = 0
+            partial_question = ''
+            async with self.client.messages.stream(
+                model=GameConfig.CLAUDE_MODELS[model],
+                max_tokens=GameConfig.MAX_TOKENS,
+                temperature=temperature,
+                system=GameConfig.SYSTEM_PROMPT,
+                messages=[{"role": "user", "content": content}],
+                tools=[GameConfig.QUESTION_TOOL],
+                tool_choice=GameConfig.QUESTION_TOOL_CHOICE
+            ) as stream:
+                async for event in stream:
+                    if event.type == 'input_json':
+                        received += len(event.partial_json)
+                        if isinstance(event.snapshot, dict):
+                            partial_question = event.snapshot.get('Question', partial_question)
+                    elif event.type == 'text':
+                        received += len(event.text)
+                    else:
+                        continue
+                    if on_progress:
+                        on_progress(received, partial_question)
+                return await stream.get_final_message()
+
+        message = await self._call_with_retries(stream_question)
+        if message is None:
+            return None
+        logger.info("Successfully received response from Claude")
+        self._log_usage(message)
+        # A cut-off tool call arrives as a partial dict. Regenerating it would
+        # multiply the output cost, so report the failure instead.
+        if message.stop_reason == 'max_tokens':
+            logger.error("Question for %s hit max_tokens=%s; not retrying", category, GameConfig.MAX_TOKENS)
             return None
+        for block in message.content:
+            if block.type == 'tool_use':
+                return block.input
+        logger.error("Claude answered without calling emit_trivia (stop_reason=%s)", message.stop_reason)
+        return None
+
+    def _batch_params(self, category: str, grade: int, model: str) -> Dict[str, Any]:
+        """Request parameters for one batch of pooled questions."""
+        return {
+            "model": GameConfig.CLAUDE_MODELS[model],
+            "max_tokens": GameConfig.POOL_MAX_TOKENS,
+            "temperature": GameConfig.TEMPERATURE,
+            "system": GameConfig.SYSTEM_PROMPT,
+            "messages": [{"role": "user", "content": self.prepare_batch_prompt(category, grade, GameConfig.POOL_BATCH_SIZE)}],
+            "tools": [GameConfig.BATCH_TOOL],
+            "tool_choice": GameConfig.BATCH_TOOL_CHOICE,
+        }
+
+    @staticmethod
+    def _validation_error(data: Any) -> Optional[str]:
+        """Return why generated question data is unusable, or None if it is valid."""
+        try:
+            _validate_question(data)
+        except fastjsonschema.JsonSchemaValueException as e:
+            return f"Invalid question data: {e.message}"
+        return None
+
+    @staticmethod
+    def _is_complete(question: Any) -> bool:
+        """Whether generated question data is fit to store in the pool."""
+        return QuestionGenerator._validation_error(question) is None
+
+    @staticmethod
+    def _batch_questions(message: Any) -> List[Dict]:
+        """Extract the complete questions from an emit_trivia_batch response."""
+        for block in message.content:
+            if block.type == 'tool_use':
+                return [q for q in block.input.get('questions', []) if QuestionGenerator._is_complete(q)]
+        return []
+
+    async def request_batch(self, category: str, grade: int, model: str) -> List[Dict]:
+        """Generate a batch of questions for the pool in a single API call.
+
+        Incomplete questions are dropped.
+        """
+        params = self._batch_params(category, grade, model)
+        message = await self._call_with_retries(lambda: self.client.messages.create(**params))
+        if message is None:
+            return []
+        self._log_usage(message)
+        if message.stop_reason == 'max_tokens':
+            logger.warning("Batch for grade %s %s hit max_tokens; keeping its complete questions", grade, category)
+        return self._batch_questions(message)
+
+    async def warm_pool(self, grade: int, model: str) -> None:
+        """Pre-generate questions for every under-filled category of a grade.
+
+        Uses the Message Batches API, which costs half as much but can take a
+        while to finish, so the batch is polled in the background and its
+        results are added to the pool when it ends.
+        """
+        categories = {
+            f"grade{grade}-{category}": category
+            for category in GameConfig.CATEGORIES
+            if self.pool.size(grade, category) < GameConfig.POOL_REFILL_THRESHOLD
+        }
+        if not categories or not self.pool.claim_warm(grade):
+            return
+        try:
+            batch = await self.client.beta.messages.batches.create(requests=[
+                {"custom_id": custom_id, "params": self._batch_params(category, grade, model)}
+                for custom_id, category in categories.items()
+            ])
+            logger.info("Submitted warm-up batch %s for grade %s (%s categories)", batch.id, grade, len(categories))
+            while (await self.client.beta.messages.batches.retrieve(batch.id)).processing_status != 'ended':
+                await asyncio.sleep(GameConfig.BATCH_POLL_INTERVAL)
+            async for entry in await self.client.beta.messages.batches.results(batch.id):
+                if entry.result.type != 'succeeded':
+                    logger.error("Warm-up request %s did not succeed: %s", entry.custom_id, entry.result.type)
+                    continue
+                questions = self._batch_questions(entry.result.message)
+                if questions:
+                    self.pool.add(grade, categories[entry.custom_id], questions)
+            logger.info("Warm-up batch %s for grade %s finished", batch.id, grade)
         except Exception as e:
-            logging.error(f"Error in generate_question: {str(e)}")
-            st.error(f"Error generating question: {str(e)}")
+            logger.error("Error in warm-up batch for grade %s: %s", grade, e)
+        finally:
+            self.pool.release_warm(grade)
+
+    async def fresh_question(
+        self,
+        category: str,
+        grade: int,
+        model: str,
+        previous_questions: Iterable[str],
+        on_progress: Optional[Callable[[int, str], None]] = None
+    ) -> Optional[Dict]:
+        """Request a new question and remember it in the pool for other sessions."""
+        if GameConfig.PARALLEL_SAMPLES > 1:
+            question_data = await self._first_valid_sample(category, grade, model, list(previous_questions), on_progress)
+        else:
+            question_data = await self.request_question(category, grade, model, previous_questions, on_progress)
+        if self._is_complete(question_data):
+            self.pool.add(grade, category, [question_data])
+        return question_data
+
+    async def _first_valid_sample(
+        self,
+        category: str,
+        grade: int,
+        model: str,
+        previous_questions: List[str],
+        on_progress: Optional[Callable[[int, str], None]] = None
+    ) -> Optional[Dict]:
+        """Run PARALLEL_SAMPLES requests at once and return the first complete question.
+
+        Only the first sample reports progress so the preview does not jump
+        between responses. The remaining samples are cancelled once one wins.
+        """
+        tasks = [
+            asyncio.ensure_future(self.request_question(
+                category,
+                grade,
+                model,
+                previous_questions,
+                on_progress if i == 0 else None,
+                temperature=min(1.0, GameConfig.TEMPERATURE + i * GameConfig.TEMPERATURE_STEP)
+            ))
+            for i in range(GameConfig.PARALLEL_SAMPLES)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                question_data = await next_done
+                if self._is_complete(question_data):
+                    return question_data
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def pooled_question(self, category: str, grade: int, previous_questions: Iterable[str]) -> Optional[Dict]:
+        """Serve a cached question, except for a POOL_FRESH_PROBABILITY share of requests kept fresh.
+
+        Keys holding fewer than POOL_REFILL_THRESHOLD questions are not
+        served yet, so early players do not all get the same question.
+        """
+        if random.random() < GameConfig.POOL_FRESH_PROBABILITY:
             return None
+        if self.pool.size(grade, category) < GameConfig.POOL_REFILL_THRESHOLD:
+            return None
+        return self.pool.sample(grade, category, previous_questions)
+
+    def refill_pool(self, category: str, grade: int, model: str) -> None:
+        """Top up the shared pool for (grade, category) in the background when it runs low.
 
-    def parse_question(self, question_text: str) -> Tuple[Optional[str], Optional[list], Optional[str], Optional[str], Optional[str]]:
-        """Parse the generated question JSON into its components."""
+        Does nothing while a warm-up batch for the grade or another refill
+        for the key is still running.
+        """
+        if self.pool.size(grade, category) >= GameConfig.POOL_REFILL_THRESHOLD:
+            return
+        # A pending warm-up batch is already generating this key at half price
+        if self.pool.is_warming(grade):
+            return
+        if not self.pool.claim_refill(grade, category):
+            return
+        run_async(self._refill_pool(category, grade, model))
+
+    async def _refill_pool(self, category: str, grade: int, model: str) -> None:
         try:
-            logging.info(f"Raw response from Claude: {question_text}")
-            
-            if "```json" in question_text:
-                question_text = question_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in question_text:
-                question_text = question_text.split("```")[1].strip()
-                
-            question_text = question_text.strip().strip('"').strip("'")
-            
-            data = json.loads(question_text)
-            required_keys = {'Question', 'A', 'B', 'C', 'D', 'Answer', 'Explanation', 'Category'}
-            if not required_keys.issubset(data.keys()):
-                missing = required_keys - data.keys()
-                error_msg = f"Missing keys in the response: {', '.join(missing)}"
-                logging.error(error_msg)
-                st.error(error_msg)
-                return None, None, None, None, None
+            questions = await self.request_batch(category, grade, model)
+            if questions:
+                self.pool.add(grade, category, questions)
+                logger.info("Added %s questions to the pool for grade %s %s", len(questions), grade, category)
+        except Exception as e:
+            logger.error("Error refilling question pool: %s", e)
+        finally:
+            self.pool.release_refill(grade, category)
 
-            if data['Answer'] not in ['A', 'B', 'C', 'D']:
-                error_msg = f"Invalid Answer format: {data['Answer']}. Must be A, B, C, or D"
-                logging.error(error_msg)
-                st.error(error_msg)
-                return None, None, None, None, None
+    def generate_question(self, previous_questions: Deque[str], recent_categories: Deque[str]) -> Optional[Dict]:
+        """Generate a new trivia question, serving it from the pool when possible."""
+        try:
+            category = self.choose_category(recent_categories)
+            grade = st.session_state['grade_level']
+            model = resolve_model(st.session_state['model'], grade)
+            question_data = self.pooled_question(category, grade, previous_questions)
+            # Start any batch refill before waiting on a fresh question so the
+            # two requests overlap instead of running back to back. This pays
+            # for the fresh question and the batch at once, so refill_pool only
+            # starts one when no warm-up or refill is already in flight.
+            self.refill_pool(category, grade, model)
+            if question_data is None:
+                # The request runs on the event loop thread; poll it from here
+                # so the progress placeholder is updated from the script thread.
+                progress = st.empty()
+                streamed = {'chars': 0, 'question': ''}
+
+                def on_progress(chars: int, question: str) -> None:
+                    streamed.update(chars=chars, question=question)
+
+                future = run_async(self.fresh_question(
+                    category,
+                    grade,
+                    model,
+                    list(previous_questions),
+                    on_progress=on_progress
+                ))
+                rendered = (0, '')
+                while not wait([future], timeout=0.1).done:
+                    # Only send a new element when more has streamed in
+                    current = (streamed['chars'], streamed['question'])
+                    if current == rendered:
+                        continue
+                    rendered = current
+                    chars, question = current
+                    if question:
+                        progress.markdown(
+                            GameUI.QUESTION_CARD.format(category=category, question=f"{question}…"),
+                            unsafe_allow_html=True
+                        )
+                    elif chars:
+                        progress.caption(f"Generating… {chars} characters received")
+                progress.empty()
+                question_data = future.result()
+            else:
+                logger.info("Serving pooled question for grade %s %s", grade, category)
+            return question_data
+        except Exception as e:
+            logger.error("Error in generate_question: %s", e)
+            st.error(f"Error generating question: {str(e)}")
+            return None
 
-            question = data['Question'].strip()
-            options = [f"{key}) {data[key].strip()}" for key in ['A', 'B', 'C', 'D']]
-            answer = data['Answer'].strip().upper()
-            explanation = data['Explanation'].strip()
-            category = data['Category'].strip()
+    def prefetch_question(self, previous_questions: Deque[str], recent_categories: Deque[str]) -> Future:
+        """Start generating the next question on the shared event loop."""
+        category = self.choose_category(recent_categories)
+        grade = st.session_state['grade_level']
+        model = resolve_model(st.session_state['model'], grade)
+        question_data = self.pooled_question(category, grade, previous_questions)
+        self.refill_pool(category, grade, model)
+        if question_data is not None:
+            future = Future()
+            future.set_result(question_data)
+            return future
+        return run_async(self.fresh_question(
+            category,
+            grade,
+            model,
+            list(previous_questions)
+        ))
 
-            if not all([question, all(options), answer, explanation, category]):
-                error_msg = "One or more fields are empty"
-                logging.error(error_msg)
-                st.error(error_msg)
+    def parse_question(self, question_data: Dict) -> Tuple[Optional[str], Optional[List[Tuple[str, str]]], Optional[str], Optional[str], Optional[str]]:
+        """Validate the generated question data and split it into its components."""
+        try:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw response from Claude: %s", question_data)
+            
+            # Tool calls arrive already parsed, so only the schema needs checking
+            data = question_data
+            error_msg = self._validation_error(data)
+            if error_msg:
+                logger.error(error_msg)
+                st.error("The generated question was incomplete. Please try the next question.")
                 return None, None, None, None, None
 
-            logging.info("Successfully parsed question data")
+            # The schema already pins Answer to A-D; only the free-text fields need stripping
+            question, a, b, c, d, explanation, category = (data[key].strip() for key in self._TEXT_FIELDS)
+            options = [('A', a), ('B', b), ('C', c), ('D', d)]
+            answer = data['Answer']
+
+            logger.info("Successfully parsed question data")
             return question, options, answer, explanation, category
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON decoding failed: {e}\nReceived text: {question_text}")
-            st.error("Failed to parse the question. The response format was incorrect.")
-            return None, None, None, None, None
         except Exception as e:
-            logging.error(f"Unexpected error during parsing: {e}")
+            logger.error("Unexpected error during parsing: %s", e)
             st.error("An error occurred while parsing the question.")
             return None, None, None, None, None
 
+@st.cache_resource(show_spinner=False)
+def get_question_generator() -> QuestionGenerator:
+    """Return the question generator shared by all sessions."""
+    return QuestionGenerator(AnthropicClient.create(), get_question_pool())
+
+class Stats(NamedTuple):
+    """Game counters with accuracy and average attempts formatted for display."""
+    score: int
+    total_questions: int
+    accuracy: str
+    avg_attempts: str
+
+@st.cache_data(show_spinner=False)
+def format_stats(score: int, total_questions: int, total_attempts: int) -> Stats:
+    """Return the display statistics for the given counters."""
+    if total_questions > 0:
+        accuracy = (score / total_questions) * 100
+        avg_attempts = total_attempts / total_questions
+    else:
+        accuracy = 0
+        avg_attempts = 0
+    return Stats(score, total_questions, f"{accuracy:.1f}%", f"{avg_attempts:.1f}")
+
 class GameUI:
+    _STAT_CARD = '<div class="stats-card"><h3>{label}</h3><h2>{value}</h2></div>'
+    # Also used for the streaming preview, so the finished question replaces it in place
+    QUESTION_CARD = (
+        '<div class="question-card">'
+        '<span class="category-badge">{category}</span>'
+        '<h2 class="question-text">{question}</h2>'
+        '</div>'
+    )
+
+    @staticmethod
+    def _stats() -> Stats:
+        """Statistics for the current session's counters."""
+        return format_stats(
+            st.session_state['score'],
+            st.session_state['total_questions'],
+            st.session_state['total_attempts']
+        )
+
+    @staticmethod
+    def _render_stat_cards(cards: Iterable[Tuple[str, Any]]) -> None:
+        """Render (label, value) pairs as one row of stat cards in a single element."""
+        row = "".join(GameUI._STAT_CARD.format(label=label, value=value) for label, value in cards)
+        st.markdown(f'<div class="stats-row">{row}</div>', unsafe_allow_html=True)
+
     @staticmethod
     def setup_page():
         """Configure the basic page layout and styling"""
@@ -299,7 +866,9 @@ class GameUI:
             layout="wide",
             initial_sidebar_state="expanded"
         )
-        st.markdown(GameTheme.CUSTOM_CSS, unsafe_allow_html=True)
+        # Elements not re-emitted on a rerun are dropped, so the cached
+        # stylesheet is still written every time
+        st.markdown(GameTheme.custom_css(), unsafe_allow_html=True)
 
     @staticmethod
     def display_header():
@@ -309,98 +878,55 @@ class GameUI:
             unsafe_allow_html=True
         )
         st.markdown(
-            "<p style='text-align: center; color: #666;'>Test your knowledge across various STEM subjects!</p>",
+            '<p class="subtitle">Test your knowledge across various STEM subjects!</p>',
             unsafe_allow_html=True
         )
 
     @staticmethod
     def display_stats_dashboard():
         """Display game statistics in a dashboard layout"""
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown(
-                f"""
-                <div class="stats-card">
-                    <h3 style="margin:0; color: #1E88E5;">Score</h3>
-                    <h2 style="margin:0;">{st.session_state['score']}</h2>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-        
-        with col2:
-            if st.session_state['total_questions'] > 0:
-                accuracy = (st.session_state['score'] / st.session_state['total_questions']) * 100
-            else:
-                accuracy = 0
-            st.markdown(
-                f"""
-                <div class="stats-card">
-                    <h3 style="margin:0; color: #1E88E5;">Accuracy</h3>
-                    <h2 style="margin:0;">{accuracy:.1f}%</h2>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-            
-        with col3:
-            if st.session_state['total_attempts'] > 0 and st.session_state['total_questions'] > 0:
-                avg_attempts = st.session_state['total_attempts'] / st.session_state['total_questions']
-            else:
-                avg_attempts = 0
-            st.markdown(
-                f"""
-                <div class="stats-card">
-                    <h3 style="margin:0; color: #1E88E5;">Avg Attempts</h3>
-                    <h2 style="margin:0;">{avg_attempts:.1f}</h2>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+        stats = GameUI._stats()
+        GameUI._render_stat_cards((
+            ("Score", stats.score),
+            ("Accuracy", stats.accuracy),
+            ("Avg Attempts", stats.avg_attempts),
+        ))
 
     @staticmethod
     def display_question(question: str, category: str):
         """Display the current question in a card layout"""
-        st.markdown(
-            f"""
-            <div class="question-card">
-                <span class="category-badge">{category}</span>
-                <h2 style="margin-top: 1rem;">{question}</h2>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        st.markdown(GameUI.QUESTION_CARD.format(category=category, question=question), unsafe_allow_html=True)
 
     @staticmethod
-    def display_answer_options(options: list, key_suffix: str):
-        """Display answer options in an improved layout"""
+    def display_answer_options(options: List[Tuple[str, str]], key_suffix: str) -> Optional[str]:
+        """Display (letter, text) answer options and return the letter clicked, if any"""
         selected_option = None
         
         # Create two columns for options
         col1, col2 = st.columns(2)
         
-        # Display options A and B in first column
+        # Display options A and B in first column; keys use the option letter
+        # so they stay stable across retries and never collide on equal text
         with col1:
-            for option in options[:2]:
+            for letter, text in options[:2]:
                 if st.button(
-                    option,
-                    key=f"{option}_{key_suffix}",
+                    f"{letter}) {text}",
+                    key=f"opt_{letter}_{key_suffix}",
                     use_container_width=True,
                     type="secondary"
                 ):
-                    selected_option = option
+                    selected_option = letter
         
         # Display options C and D in second column
         with col2:
-            for option in options[2:]:
+            for letter, text in options[2:]:
                 if st.button(
-                    option,
-                    key=f"{option}_{key_suffix}",
+                    f"{letter}) {text}",
+                    key=f"opt_{letter}_{key_suffix}",
                     use_container_width=True,
                     type="secondary"
                 ):
-                    selected_option = option
+                    selected_option = letter
         
         return selected_option
 
@@ -417,15 +943,14 @@ class GameUI:
         )
         
         # Visual indicator of difficulty
-        level_text = "Elementary" if grade_level <= 5 else "Middle" if grade_level <= 8 else "High"
-        level_emoji = "🎈" if grade_level <= 5 else "🌟" if grade_level <= 8 else "🎓"
+        level_text, level_emoji = get_grade_level_info(grade_level)
         
         st.sidebar.markdown(
             f"""
-            <div style='text-align: center; padding: 1rem; background-color: white; border-radius: 0.5rem;'>
-                <div style='font-size: 2rem;'>{level_emoji}</div>
-                <div style='font-weight: bold; color: #1E88E5;'>{level_text} School</div>
-                <div style='color: #666;'>Grade {grade_level}</div>
+            <div class="grade-indicator">
+                <div class="grade-emoji">{level_emoji}</div>
+                <div class="grade-level">{level_text} School</div>
+                <div class="muted">Grade {grade_level}</div>
             </div>
             """,
             unsafe_allow_html=True
@@ -433,6 +958,27 @@ class GameUI:
         
         return grade_level
 
+    @staticmethod
+    def display_model_selector():
+        """Display the Claude model selector"""
+        models = list(GameConfig.MODEL_CHOICES)
+        return st.sidebar.selectbox(
+            "Model",
+            options=models,
+            index=models.index(st.session_state.get('model', GameConfig.CLAUDE_MODEL)),
+            format_func=str.capitalize,
+            help="Auto uses Haiku up to grade 8 and Sonnet for high school; Haiku is fastest, Sonnet and Opus trade speed for question quality"
+        )
+
+    @staticmethod
+    def display_bulk_mode_toggle():
+        """Display the switch for pre-generating questions through the Message Batches API"""
+        return st.sidebar.toggle(
+            "Bulk Mode (cheaper, slower start)",
+            value=st.session_state.get('bulk_mode', False),
+            help="Pre-generate questions for your grade in one discounted batch; they arrive over the next few minutes"
+        )
+
     @staticmethod
     def display_game_controls():
         """Display game control buttons"""
@@ -461,14 +1007,20 @@ class GameUI:
             
         return next_question, retry_question, end_game
 
+    @staticmethod
+    def display_correct(attempts: int):
+        """Display the success message for a correctly answered question"""
+        attempt_text = "try" if attempts == 1 else "tries"
+        st.success(f"🎉 Correct! Got it in {attempts} {attempt_text}!")
+
     @staticmethod
     def display_explanation(explanation: str):
         """Display the answer explanation in a card"""
         st.markdown(
             f"""
-            <div style='background-color: #E3F2FD; padding: 1rem; border-radius: 0.5rem; margin-top: 1rem;'>
-                <h3 style='color: #1E88E5; margin: 0;'>Explanation</h3>
-                <p style='margin: 0.5rem 0 0 0;'>{explanation}</p>
+            <div class="explanation-card">
+                <h3>Explanation</h3>
+                <p>{explanation}</p>
             </div>
             """,
             unsafe_allow_html=True
@@ -481,63 +1033,25 @@ class GameUI:
             st.markdown(
                 """
                 <div class="question-card">
-                    <h2 style="color: #1E88E5; margin-bottom: 1rem;">🎮 Game Over!</h2>
-                    <div style="margin-bottom: 1rem;">
+                    <h2 class="game-over-title">🎮 Game Over!</h2>
+                </div>
                 """,
                 unsafe_allow_html=True
             )
             
-            # Calculate statistics
-            total_questions = st.session_state['total_questions']
-            correct_answers = st.session_state['score']
-            
-            if total_questions > 0:
-                accuracy = (correct_answers / total_questions) * 100
-                avg_attempts = st.session_state['total_attempts'] / total_questions
-            else:
-                accuracy = 0
-                avg_attempts = 0
-                
             # Display final statistics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown(
-                    f"""
-                    <div class="stats-card">
-                        <h3 style="margin:0; color: #1E88E5;">Total Questions</h3>
-                        <h2 style="margin:0;">{total_questions}</h2>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            
-            with col2:
-                st.markdown(
-                    f"""
-                    <div class="stats-card">
-                        <h3 style="margin:0; color: #1E88E5;">Final Score</h3>
-                        <h2 style="margin:0;">{correct_answers}</h2>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-                
-            with col3:
-                st.markdown(
-                    f"""
-                    <div class="stats-card">
-                        <h3 style="margin:0; color: #1E88E5;">Accuracy</h3>
-                        <h2 style="margin:0;">{accuracy:.1f}%</h2>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
+            stats = GameUI._stats()
+            GameUI._render_stat_cards((
+                ("Total Questions", stats.total_questions),
+                ("Final Score", stats.score),
+                ("Accuracy", stats.accuracy),
+            ))
                 
             # Display average attempts
             st.markdown(
                 f"""
-                <div style='text-align: center; margin-top: 1rem;'>
-                    <p style='color: #666;'>Average attempts per question: <strong>{avg_attempts:.1f}</strong></p>
+                <div class="end-note">
+                    <p>Average attempts per question: <strong>{stats.avg_attempts}</strong></p>
                 </div>
                 """,
                 unsafe_allow_html=True
@@ -546,8 +1060,8 @@ class GameUI:
             # Thank you message
             st.markdown(
                 """
-                <div style='text-align: center; margin: 2rem 0;'>
-                    <p style='color: #1E88E5; font-size: 1.2rem;'>
+                <div class="thanks">
+                    <p>
                         Thank you for playing the STRAUS Math and Science Trivia Game! 👏
                     </p>
                 </div>
@@ -559,11 +1073,9 @@ class GameUI:
             if st.button("Play Again 🔄", type="primary", use_container_width=True):
                 SessionState.reset_game()
                 st.rerun()
-                
-            st.markdown("</div></div>", unsafe_allow_html=True)
             
         except Exception as e:
-            logging.error(f"Error in handle_end_game: {str(e)}")
+            logger.error("Error in handle_end_game: %s", e)
             st.error("Error handling game end")
 
 
@@ -571,6 +1083,47 @@ class GameLogic:
     def __init__(self, question_generator: QuestionGenerator):
         self.question_generator = question_generator
 
+    @staticmethod
+    def _prefetch_context() -> Tuple[int, str]:
+        """Settings a prefetched question must match to be served."""
+        return st.session_state['grade_level'], st.session_state['model']
+
+    def prefetch_next_question(self) -> None:
+        """Kick off generation of the next question while the user reads the current one."""
+        try:
+            st.session_state['next_question_future'] = self.question_generator.prefetch_question(
+                st.session_state['previous_questions'],
+                st.session_state['recent_categories']
+            )
+            st.session_state['next_question_context'] = self._prefetch_context()
+            logger.info("Prefetching next question")
+        except Exception as e:
+            logger.error("Error starting question prefetch: %s", e)
+
+    @staticmethod
+    def cancel_prefetch() -> None:
+        """Drop a pending prefetch whose grade or model no longer applies."""
+        future = st.session_state['next_question_future']
+        if future is not None:
+            future.cancel()
+            logger.info("Cancelled stale question prefetch")
+        st.session_state['next_question_future'] = None
+        st.session_state['next_question_context'] = None
+
+    def take_prefetched_question(self) -> Optional[Dict]:
+        """Return the prefetched question data if it is still valid, else None."""
+        future = st.session_state['next_question_future']
+        context = st.session_state['next_question_context']
+        st.session_state['next_question_future'] = None
+        st.session_state['next_question_context'] = None
+        if future is None or context != self._prefetch_context():
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error("Prefetched question failed: %s", e)
+            return None
+
     def set_new_question(self) -> None:
         """Generate and set a new question in session state."""
         try:
@@ -581,15 +1134,24 @@ class GameLogic:
             st.session_state['current_attempts'] = 0
             st.session_state['retry_mode'] = False
             
+            grade = st.session_state['grade_level']
+            if st.session_state['bulk_mode'] and grade not in st.session_state['warmed_grades']:
+                st.session_state['warmed_grades'].add(grade)
+                run_async(self.question_generator.warm_pool(grade, resolve_model(st.session_state['model'], grade)))
+            
             with st.spinner("Generating a new question..."):
-                logging.info("Starting question generation")
-                question_text = self.question_generator.generate_question(
-                    st.session_state['previous_questions'],
-                    st.session_state['used_categories']
-                )
+                question_data = self.take_prefetched_question()
+                if question_data:
+                    logger.info("Using prefetched question")
+                else:
+                    logger.info("Starting question generation")
+                    question_data = self.question_generator.generate_question(
+                        st.session_state['previous_questions'],
+                        st.session_state['recent_categories']
+                    )
             
-            if question_text:
-                question, options, answer, explanation, category = self.question_generator.parse_question(question_text)
+            if question_data:
+                question, options, answer, explanation, category = self.question_generator.parse_question(question_data)
                 if question and options and answer:
                     st.session_state.update({
                         'current_question': question,
@@ -597,45 +1159,80 @@ class GameLogic:
                         'correct_answer': answer,
                         'explanation': explanation,
                         'category': category,
-                        'previous_questions': st.session_state['previous_questions'] + [question],
+                        'question_id': st.session_state['question_id'] + 1,
                         'answered': False,
                     })
-                    logging.info("Successfully set new question")
+                    st.session_state['previous_questions'].append(question)
+                    logger.info("Successfully set new question")
                 else:
                     st.error("Couldn't parse the question correctly.")
-                    logging.error("Failed to parse question components")
+                    logger.error("Failed to parse question components")
             else:
                 st.error("Failed to generate a question from Claude.")
-                logging.error("No question text received from Claude")
+                logger.error("No question text received from Claude")
                 
             st.session_state['loading_question'] = False
         except Exception as e:
-            logging.error(f"Error in set_new_question: {str(e)}")
+            logger.error("Error in set_new_question: %s", e)
             st.error(f"Error setting new question: {str(e)}")
             st.session_state['loading_question'] = False
 
-    def submit_answer(self, selected_option: str) -> None:
-        """Handle the answer submission."""
+    def submit_answer(self, user_answer: str) -> bool:
+        """Handle the answer submission for the chosen option letter; True if it was correct."""
         try:
             if not st.session_state['answered']:
-                user_answer = selected_option.split(')')[0].strip().upper()
-                st.session_state['current_attempts'] += 1
-                st.session_state['total_attempts'] += 1
-
-                if user_answer == st.session_state['correct_answer'].upper():
-                    st.session_state['score'] += 1
-                    attempt_text = "try" if st.session_state['current_attempts'] == 1 else "tries"
-                    st.success(f"🎉 Correct! Got it in {st.session_state['current_attempts']} {attempt_text}!")
-                    logging.info(f"Correct answer submitted after {st.session_state['current_attempts']} attempts")
-                    st.session_state['answered'] = True
-                    st.session_state['retry_mode'] = False
+                attempts = st.session_state['current_attempts'] + 1
+                updates = {
+                    'current_attempts': attempts,
+                    'total_attempts': st.session_state['total_attempts'] + 1,
+                }
+                correct = user_answer == st.session_state['correct_answer']
+
+                if correct:
+                    logger.info("Correct answer submitted after %s attempts", attempts)
+                    updates.update({
+                        'score': st.session_state['score'] + 1,
+                        'answered': True,
+                        'retry_mode': False,
+                    })
                 else:
                     st.error("❌ Incorrect! Try again!")
-                    st.session_state['retry_mode'] = True
-                    
+                    updates['retry_mode'] = True
+
+                st.session_state.update(updates)
+                if correct:
+                    self.prefetch_next_question()
+                return correct
         except Exception as e:
-            logging.error(f"Error in submit_answer: {str(e)}")
+            logger.error("Error in submit_answer: %s", e)
             st.error("Error processing answer")
+        return False
+
+    @st.fragment
+    def answer_area(self) -> None:
+        """Render the answer options as a fragment.
+
+        A wrong answer only reruns this fragment; a correct one reruns the
+        whole app so the score, explanation and sidebar stats update.
+        """
+        # Show attempts if in retry mode
+        if st.session_state['retry_mode']:
+            st.markdown(
+                f"<div class='muted'>Attempts so far: {st.session_state['current_attempts']}</div>",
+                unsafe_allow_html=True
+            )
+
+        # Display answer options and handle selection
+        selected_option = GameUI.display_answer_options(
+            st.session_state['options'],
+            key_suffix=f"question_{st.session_state['question_id']}"
+        )
+
+        # Process answer if selected
+        if selected_option:
+            logger.info("Answer submission attempted")
+            if self.submit_answer(selected_option):
+                st.rerun()
 
 
 def main():
@@ -655,12 +1252,11 @@ def main():
         # Display main header
         GameUI.display_header()
         
-        logging.info("Starting application")
+        logger.info("Starting application")
         
         # Initialize game components
-        client = AnthropicClient.create()
         SessionState.initialize()
-        question_generator = QuestionGenerator(client)
+        question_generator = get_question_generator()
         game_logic = GameLogic(question_generator)
         
         # Sidebar components
@@ -672,7 +1268,17 @@ def main():
             if grade_level != st.session_state['grade_level']:
                 st.session_state['grade_level'] = grade_level
                 st.session_state['current_question'] = None
-                logging.info(f"Grade level changed to {grade_level}")
+                game_logic.cancel_prefetch()
+                logger.info("Grade level changed to %s", grade_level)
+            
+            # Model selector
+            model = GameUI.display_model_selector()
+            if model != st.session_state['model']:
+                st.session_state['model'] = model
+                game_logic.cancel_prefetch()
+                logger.info("Model changed to %s", model)
+            
+            st.session_state['bulk_mode'] = GameUI.display_bulk_mode_toggle()
             
             st.markdown("---")
             
@@ -690,21 +1296,21 @@ def main():
         # Handle control actions
         if end_game:
             st.session_state['game_over'] = True
-            logging.info("Game end requested")
+            logger.info("Game end requested")
             GameUI.handle_end_game()
             return
 
         if next_question:
-            logging.info("New question requested")
+            logger.info("New question requested")
             game_logic.set_new_question()
 
         if retry_question and not st.session_state['answered']:
-            logging.info("Question retry requested")
+            logger.info("Question retry requested")
             st.session_state['retry_mode'] = True
 
         # Initial question generation
         if st.session_state['current_question'] is None and not st.session_state['loading_question']:
-            logging.info("Initial question generation")
+            logger.info("Initial question generation")
             game_logic.set_new_question()
 
         # Display current question and handle answers
@@ -716,30 +1322,15 @@ def main():
             )
 
             if not st.session_state['answered'] and not st.session_state['loading_question']:
-                # Show attempts if in retry mode
-                if st.session_state['retry_mode']:
-                    st.markdown(
-                        f"<div style='color: #666;'>Attempts so far: {st.session_state['current_attempts']}</div>",
-                        unsafe_allow_html=True
-                    )
-                
-                # Display answer options and handle selection
-                selected_option = GameUI.display_answer_options(
-                    st.session_state['options'],
-                    key_suffix=f"attempt_{st.session_state['current_attempts']}"
-                )
-                
-                # Process answer if selected
-                if selected_option:
-                    logging.info("Answer submission attempted")
-                    game_logic.submit_answer(selected_option)
+                game_logic.answer_area()
 
-            # Show explanation after answering
+            # Show result and explanation after answering
             if st.session_state['answered']:
+                GameUI.display_correct(st.session_state['current_attempts'])
                 GameUI.display_explanation(st.session_state['explanation'])
 
     except Exception as e:
-        logging.error(f"Critical error in main function: {str(e)}")
+        logger.error("Critical error in main function: %s", e)
         st.error("An unexpected error occurred in the application")
 
 
@@ -1,29 +1,157 @@
 import hashlib
 import hmac
+import json
+import os
+import re
+import secrets
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
 import streamlit as st
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 
-def check_password(password: str, stored_hash: str, salt: str) -> bool:
-    """Verify a stored password against a given password"""
+# hashlib's PBKDF2 runs in OpenSSL, which already uses SHA extensions where the CPU has them
+PBKDF2_ALGORITHM = 'sha256'
+PBKDF2_ITERATIONS = 100000
+
+# Argon2id for new credentials; the encoded hash carries its own salt and parameters
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+
+def hash_password(password: str) -> str:
+    """Return an Argon2id hash to store as a user's password_hash"""
+    return _password_hasher.hash(password)
+
+def check_password(password: str, stored_hash: Union[str, bytes], salt: Optional[bytes] = None) -> bool:
+    """Verify a stored password against a given password
+
+    Argon2 hashes arrive as their encoded string and are verified directly;
+    older PBKDF2 hashes arrive already decoded to bytes, with their salt.
+    """
+    if isinstance(stored_hash, str):
+        try:
+            return _password_hasher.verify(stored_hash, password)
+        except (InvalidHashError, VerificationError):
+            return False
+    if salt is None:
+        return False
     return hmac.compare_digest(
-        hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000),
-        bytes.fromhex(stored_hash)
+        hashlib.pbkdf2_hmac(PBKDF2_ALGORITHM, password.encode(), salt, PBKDF2_ITERATIONS),
+        stored_hash
     )
 
+@st.cache_resource(show_spinner=False)
+def _load_credentials() -> Dict[str, Tuple[Union[str, bytes], Optional[bytes]]]:
+    """Decode the credentials in st.secrets once per process
+
+    Maps each username to the (stored_hash, salt) pair check_password takes.
+    Entries with a malformed hash are skipped.
+    """
+    credentials = {}
+    try:
+        entries = st.secrets.auth.credentials
+    except (KeyError, AttributeError):
+        return credentials
+    for username, entry in entries.items():
+        try:
+            stored_hash = entry['password_hash']
+            if stored_hash.startswith('$argon2'):
+                credentials[username] = (stored_hash, None)
+            else:
+                salt = entry.get('salt')
+                credentials[username] = (bytes.fromhex(stored_hash), salt.encode() if salt else None)
+        except (KeyError, AttributeError, ValueError):
+            continue
+    return credentials
+
+# Logins survive a browser refresh through a token in the URL that names a
+# session file. Streamlit cannot set HTTP-only cookies, so the token is a
+# bearer credential in the address bar: anyone holding a copied link, bookmark
+# or history entry is logged in until it expires. That risk is accepted for a
+# classroom trivia game and bounded by SESSION_TTL and by each login revoking
+# the user's older tokens. Only the login is persisted, not game progress: a
+# refresh already resets the score, and the shared question pool does not
+# depend on the session's history, so restoring recently seen questions would
+# only shorten the first few prompts.
+SESSION_DIR = Path(__file__).parent / '.trivia_sessions'
+SESSION_TTL = 3600
+SESSION_PARAM = 'session'
+_SESSION_TOKEN_RE = re.compile(r'[0-9a-f]{32}')
+
+def _session_path(token: Optional[str]) -> Optional[Path]:
+    """Return the session file for a well-formed token, or None"""
+    if not token or not _SESSION_TOKEN_RE.fullmatch(token):
+        return None
+    return SESSION_DIR / f"{token}.json"
+
+def _prune_sessions(username: str):
+    """Delete expired or unreadable session files and any older ones for ``username``"""
+    now = time.time()
+    for path in SESSION_DIR.glob('*.json'):
+        try:
+            session = json.loads(path.read_text())
+            if session['expires'] > now and session['user'] != username:
+                continue
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+def save_session(username: str):
+    """Persist a login and put its token in the URL, revoking the user's older tokens"""
+    token = secrets.token_hex(16)
+    try:
+        # Tokens are credentials: keep the directory and files owner-only
+        SESSION_DIR.mkdir(mode=0o700, exist_ok=True)
+        SESSION_DIR.chmod(0o700)
+        _prune_sessions(username)
+        fd = os.open(_session_path(token), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(json.dumps({'user': username, 'expires': time.time() + SESSION_TTL}))
+        st.query_params[SESSION_PARAM] = token
+    except OSError:
+        pass
+
+def restore_session() -> Optional[str]:
+    """Return the username of an unexpired persisted login, if any"""
+    path = _session_path(st.query_params.get(SESSION_PARAM))
+    if path is None:
+        return None
+    try:
+        session = json.loads(path.read_text())
+        if session['expires'] > time.time() and session['user'] in _load_credentials():
+            return session['user']
+        path.unlink(missing_ok=True)
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return None
+
+def clear_session():
+    """Delete the persisted login and drop its token from the URL"""
+    path = _session_path(st.query_params.get(SESSION_PARAM))
+    if path is not None:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+    if SESSION_PARAM in st.query_params:
+        del st.query_params[SESSION_PARAM]
+
 def init_auth_state():
     """Initialize authentication state"""
     if 'authenticated' not in st.session_state:
-        st.session_state.authenticated = False
-        st.session_state.username = None
+        username = restore_session()
+        st.session_state.authenticated = username is not None
+        st.session_state.username = username
 
 def authenticate_user(username: str, password: str) -> bool:
     """Authenticate a user against stored credentials"""
-    try:
-        user_credentials = st.secrets.auth.credentials[username]
-        stored_hash = user_credentials['password_hash']
-        salt = user_credentials['salt']
-        return check_password(password, stored_hash, salt)
-    except (KeyError, AttributeError):
+    credentials = _load_credentials().get(username)
+    if credentials is None:
         return False
+    return check_password(password, *credentials)
 
 def login_page():
     """Display the login page"""
@@ -40,12 +168,16 @@ def login_page():
             if authenticate_user(username, password):
                 st.session_state.authenticated = True
                 st.session_state.username = username
+                save_session(username)
                 st.rerun()
             else:
                 st.error("Invalid username or password")
 
 def logout():
     """Log out the user"""
+    clear_session()
+    if st.session_state.username:
+        _prune_sessions(st.session_state.username)
     st.session_state.authenticated = False
     st.session_state.username = None
     st.rerun()